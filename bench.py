@@ -0,0 +1,139 @@
+# bench.py
+import json
+import os
+import resource
+import tempfile
+import time
+
+import numpy as np
+
+import storage
+import synthetic
+from gallery import Gallery
+from matcher import identify_many, pool_size
+
+# Matching is pure Python (~1-2 ms per comparison), so larger galleries take
+# hours; pass bigger sizes explicitly
+SIZES = (1_000, 5_000, 20_000)
+N_PROBES = 20                 # batched throughput and rank-1
+LATENCY_PROBES = 5            # timed one at a time, serially
+REPORT_PATH = None            # e.g. "evaluation_reports/scaling.json"
+
+
+def _peak_rss_mb(who=resource.RUSAGE_SELF):
+    # ru_maxrss is reported in KiB on Linux and is a process-lifetime maximum.
+    # For RUSAGE_CHILDREN it is the largest single child reaped so far, i.e.
+    # the biggest pool worker of any size run up to now, not of this one.
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def _gallery_mb(gallery):
+    return sum(t.xy.nbytes + t.kind.nbytes + t.angles.nbytes for t in gallery.values()) / 2**20
+
+
+def run_scaling(sizes=SIZES, n_probes=N_PROBES, db_path=None, seed=0, workers=None,
+                mated_ratio=0.8, top_k=10, latency_probes=LATENCY_PROBES):
+    """Grow a synthetic gallery through `sizes` and measure search at each size.
+
+    Everything runs offline against a synthetic templates store (a temporary
+    database unless `db_path` is given). For each size, reports enrollment
+    and load throughput, single-probe latency percentiles, batched
+    identify_many throughput, rank-1 accuracy on mated probes and memory.
+
+    Latency is measured on the first `latency_probes` probes, serially in
+    this process (workers=1) the way search.search_database runs; `workers`
+    only applies to the batched throughput run over all `n_probes`. Each pool worker holds its own copy of the gallery, so
+    memory is reported for the parent, for the largest worker, and as an
+    estimated total of parent + workers x worker.
+    """
+    tmpdir = None
+    if db_path is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmpdir.name, "synthetic.db")
+
+    rows = []
+    enrolled = 0
+    try:
+        for size in sorted(sizes):
+            t0 = time.perf_counter()
+            synthetic.generate_gallery(size, db_path, start=enrolled, seed=seed)
+            enroll_s = time.perf_counter() - t0
+            new_templates = size - enrolled
+            enrolled = size
+
+            t0 = time.perf_counter()
+            gallery = Gallery(db_path)
+            load_s = time.perf_counter() - t0
+            keys = list(gallery)
+
+            probes = synthetic.generate_probes(n_probes, size, seed=seed, mated_ratio=mated_ratio)
+            queries = [q for _, q in probes]
+
+            # One probe at a time in this process, like search.search_database;
+            # a process pool here would mostly time pool startup
+            latencies = []
+            for query in queries[:latency_probes]:
+                t0 = time.perf_counter()
+                identify_many([query], gallery, top_k=top_k, workers=1)
+                latencies.append(time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            top_idx, _ = identify_many(queries, gallery, top_k=top_k, workers=workers)
+            batch_s = time.perf_counter() - t0
+            # Workers have exited once identify_many returns, so RUSAGE_CHILDREN covers them
+            n_workers = pool_size(len(queries), size, workers)
+            parent_mb = _peak_rss_mb()
+            worker_mb = _peak_rss_mb(resource.RUSAGE_CHILDREN) if n_workers > 1 else 0.0
+
+            mated = [(key, row) for (key, _), row in zip(probes, top_idx) if key is not None]
+            rank1 = (sum(keys[row[0]] == key for key, row in mated) / len(mated)) if mated else float('nan')
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+
+            rows.append({
+                'gallery_size': size,
+                'enroll_templates_per_s': new_templates / enroll_s if enroll_s else float('nan'),
+                'load_s': load_s,
+                'latency_p50_ms': p50,
+                'latency_p95_ms': p95,
+                'latency_p99_ms': p99,
+                'batch_probes_per_s': len(queries) / batch_s,
+                'batch_comparisons_per_s': len(queries) * size / batch_s,
+                'rank1': rank1,
+                'gallery_mb': _gallery_mb(gallery),
+                'peak_rss_mb': parent_mb,
+                'workers': max(n_workers, 1),
+                'worker_lifetime_max_rss_mb': worker_mb,
+                'total_rss_estimate_mb': parent_mb + (n_workers if worker_mb else 0) * worker_mb,
+            })
+            print_row(rows[-1])
+    finally:
+        storage.close(db_path)
+        if tmpdir is not None:
+            tmpdir.cleanup()
+    return rows
+
+
+def print_row(row):
+    print(f"gallery={row['gallery_size']:>9,d}  "
+          f"enroll={row['enroll_templates_per_s']:>9,.0f}/s  "
+          f"load={row['load_s']:7.2f}s  "
+          f"p50/p95/p99={row['latency_p50_ms']:9.1f}/{row['latency_p95_ms']:9.1f}/"
+          f"{row['latency_p99_ms']:9.1f} ms  "
+          f"batch={row['batch_comparisons_per_s']:>11,.0f} cmp/s  "
+          f"rank1={100 * row['rank1']:5.1f}%  "
+          f"gallery={row['gallery_mb']:7.1f} MiB  rss={row['peak_rss_mb']:7.1f} MiB "
+          + ("(inline)" if row['workers'] <= 1 else
+             f"(+ {row['workers']} x worker max so far {row['worker_lifetime_max_rss_mb']:.1f} MiB, "
+             f"~{row['total_rss_estimate_mb']:.1f} MiB total)"))
+
+
+def save_report(rows, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    rows = run_scaling()
+    if REPORT_PATH:
+        save_report(rows, REPORT_PATH)
@@ -0,0 +1,85 @@
+# cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import storage
+
+
+def image_digest(img):
+    """Exact digest of a query image (shape, dtype and pixels)."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((img.shape, str(img.dtype))).encode())
+    h.update(img.tobytes())
+    return h.hexdigest()
+
+
+def minutiae_digest(minutiae):
+    """Digest of a minutiae set in its stored (canonical) encoding."""
+    return hashlib.blake2b(storage.encode_template(minutiae), digest_size=16).hexdigest()
+
+
+class LRUCache:
+    """Bounded LRU cache with a per-entry TTL and revision-based invalidation.
+
+    set_revision() drops every entry when the tagged revision changes, so
+    results computed against an older gallery are never served. Hit, miss
+    and invalidation counters are exposed through stats().
+    """
+
+    def __init__(self, maxsize=256, ttl=30.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.revision = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (self.ttl is None or entry[1] > self._clock()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            expires = self._clock() + self.ttl if self.ttl is not None else None
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def set_revision(self, revision):
+        """Tag the cache with a gallery revision, clearing it if that changed."""
+        with self._lock:
+            if revision != self.revision:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self.revision = revision
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+        }
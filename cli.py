@@ -0,0 +1,197 @@
+# cli.py
+"""Command-line entry point: fingerprint {enroll,search,verify,eval,bench,report}.
+
+Only argparse is imported up front. Each subcommand imports the modules it
+needs (cv2, skimage, scipy, matplotlib, ...) when it runs, so cheap
+commands and --help stay fast.
+"""
+import time
+
+_START = time.perf_counter()
+
+import argparse
+import os
+import sys
+
+DB_PATH = "fingerprints.db"
+
+
+def _read_image(path):
+    import cv2
+
+    img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        raise SystemExit(f"Failed to load image: {path}")
+    return img
+
+
+def _require_db(path):
+    # storage.connect would create an empty store; read-only commands should not
+    if not os.path.exists(path):
+        raise SystemExit(f"Database not found: {path}")
+
+
+# ---------- Subcommands ----------
+def cmd_enroll(args):
+    if args.image:
+        from enrollment import enroll_fingerprint
+
+        if not args.subject:
+            raise SystemExit("--subject is required when enrolling a single image")
+        enroll_fingerprint(args.subject, _read_image(args.image), args.db)
+        return 0
+
+    import enroll_subset
+
+    written = enroll_subset.enroll(args.dataset, args.db, args.max_subjects, args.max_fingers)
+    print(f"Enrolled {written} templates into {args.db}")
+    return 0
+
+
+def cmd_search(args):
+    _require_db(args.db)
+    from search import search_database
+
+    best_id, confidence = search_database(_read_image(args.image), args.db, args.threshold)
+    if best_id:
+        print(f"Best match: {best_id} with confidence {confidence:.2f}")
+        return 0
+    print(f"No match found above threshold. max confidence was {confidence}")
+    return 1
+
+
+def cmd_verify(args):
+    _require_db(args.db)
+    from search import verify
+
+    accepted, confidence = verify(_read_image(args.image), args.subject, args.finger,
+                                  args.db, args.threshold)
+    print(f"{'ACCEPT' if accepted else 'REJECT'} {args.subject} (confidence {confidence:.2f})")
+    return 0 if accepted else 1
+
+
+def cmd_eval(args):
+    _require_db(args.db)
+    rank_k = tuple(args.rank_k)
+    if args.probes:
+        import eval_pipline
+
+        eval_pipline.main(args.db, args.probes, rank_k)
+    elif args.charts:
+        import evaluate_altered_with_charts
+
+        evaluate_altered_with_charts.evaluate_altered(rank_k, args.db, args.altered, args.report_dir)
+    else:
+        import eval_subset
+
+        eval_subset.evaluate_altered(rank_k, args.db, args.altered)
+    return 0
+
+
+def cmd_bench(args):
+    import bench
+
+    rows = bench.run_scaling(args.sizes, args.probes, args.db, args.seed, args.workers,
+                             args.mated_ratio, latency_probes=args.latency_probes)
+    if args.out:
+        bench.save_report(rows, args.out)
+        print(f"Saved {args.out}")
+    return 0
+
+
+def cmd_report(args):
+    _require_db(args.db)
+    import numpy as np
+    import storage
+
+    counts = []
+    subjects = set()
+    for subject, _, minutiae in storage.iter_templates(args.db):
+        subjects.add(subject)
+        counts.append(len(minutiae))
+
+    conn = storage.connect(args.db)
+    print(f"Database:        {args.db}")
+    print(f"Schema version:  {conn.execute('PRAGMA user_version').fetchone()[0]}")
+    print(f"Revision:        {storage.current_revision(args.db)}")
+    print(f"Templates:       {len(counts)}")
+    print(f"Subjects:        {len(subjects)}")
+    if counts:
+        counts = np.array(counts)
+        print(f"Minutiae/tmpl:   mean {counts.mean():.1f}, min {counts.min()}, max {counts.max()}")
+    return 0
+
+
+# ---------- Parser ----------
+def build_parser():
+    parser = argparse.ArgumentParser(prog="fingerprint", description=__doc__.splitlines()[0])
+    parser.add_argument("--timing", action="store_true",
+                        help="report startup and total time on stderr")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("enroll", help="enroll a SOCOFing subset or a single image")
+    p.add_argument("--db", default=DB_PATH)
+    p.add_argument("--dataset", default="SOKOTO/socofing/SOCOFing/Real")
+    p.add_argument("--max-subjects", type=int, default=100)
+    p.add_argument("--max-fingers", type=int, default=1)
+    p.add_argument("--image", help="enroll this image only (requires --subject)")
+    p.add_argument("--subject", help="subject id for --image")
+    p.set_defaults(func=cmd_enroll)
+
+    p = sub.add_parser("search", help="1:N identification of one image")
+    p.add_argument("image")
+    p.add_argument("--db", default=DB_PATH)
+    p.add_argument("--threshold", type=float, default=0.3)
+    p.set_defaults(func=cmd_search)
+
+    p = sub.add_parser("verify", help="1:1 verification against a claimed subject")
+    p.add_argument("image")
+    p.add_argument("subject")
+    p.add_argument("--finger", help="restrict to one finger_id")
+    p.add_argument("--db", default=DB_PATH)
+    p.add_argument("--threshold", type=float, default=0.3)
+    p.set_defaults(func=cmd_verify)
+
+    p = sub.add_parser("eval", help="rank-k identification on altered (or other) probes")
+    p.add_argument("--db", default=DB_PATH)
+    p.add_argument("--altered", default="SOKOTO/socofing/SOCOFing/Altered/Altered-Easy")
+    p.add_argument("--rank-k", type=int, nargs="+", default=[1, 5, 10])
+    p.add_argument("--charts", action="store_true", help="also write charts and a summary report")
+    p.add_argument("--report-dir", default="evaluation_reports")
+    p.add_argument("--probes", help="glob of probe images named <subject>_*.BMP instead of --altered")
+    p.set_defaults(func=cmd_eval)
+
+    p = sub.add_parser("bench", help="offline scaling benchmark on a synthetic gallery")
+    p.add_argument("--sizes", type=int, nargs="+", default=[1_000, 5_000, 20_000],
+                   help="gallery sizes; matching costs ~1-2 ms per comparison, "
+                        "so 100000 runs for hours")
+    p.add_argument("--probes", type=int, default=20, help="probes for the batched run")
+    p.add_argument("--latency-probes", type=int, default=5,
+                   help="probes timed one at a time (serially)")
+    p.add_argument("--db", default=None, help="templates store to grow (default: temporary)")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--mated-ratio", type=float, default=0.8)
+    p.add_argument("--out", help="write results as JSON")
+    p.set_defaults(func=cmd_bench)
+
+    p = sub.add_parser("report", help="summarize the templates store")
+    p.add_argument("--db", default=DB_PATH)
+    p.set_defaults(func=cmd_report)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.timing:
+        print(f"startup: {1000 * (time.perf_counter() - _START):.1f} ms", file=sys.stderr)
+    try:
+        return args.func(args)
+    finally:
+        if args.timing:
+            print(f"total: {1000 * (time.perf_counter() - _START):.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
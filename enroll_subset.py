@@ -1,29 +1,18 @@
 # enroll_subset.py
 import cv2
 import glob
-import sqlite3
-import json
 import os
 from feature_extractor import extract_minutiae
+import storage
 
 DB_PATH = "fingerprints.db"
 DATASET_PATH = "SOKOTO/socofing/SOCOFing/Real"
 MAX_SUBJECTS = 100        # <<<<< CHANGE THIS
 MAX_FINGERS = 1          # <<<<< CHANGE THIS
+BATCH_SIZE = 16          # templates per commit; extraction is slow, so keep batches small
 
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS templates (
-            subject_id TEXT,
-            finger_id TEXT,
-            minutiae BLOB,
-            PRIMARY KEY (subject_id, finger_id)
-        )
-    """)
-    conn.commit()
-    conn.close()
+def init_db(db_path=DB_PATH):
+    storage.init_db(db_path)
 
 def parse_socofing_name(path):
     """
@@ -47,21 +36,21 @@ def parse_socofing_name(path):
     finger_id = f"{hand}_{finger}"
     return subject_id, finger_id
 
-def enroll():
-    init_db()
-    files = sorted(glob.glob(f"{DATASET_PATH}/*.BMP"))
+def iter_enrollments(dataset_path=DATASET_PATH, max_subjects=MAX_SUBJECTS, max_fingers=MAX_FINGERS):
+    """Yield (subject_id, finger_id, minutiae) for the configured subset."""
+    files = sorted(glob.glob(f"{dataset_path}/*.BMP"))
 
     enrolled = {}
 
     for file in files:
         subject, finger = parse_socofing_name(file)
 
-        if subject not in enrolled and len(enrolled) >= MAX_SUBJECTS:
+        if subject not in enrolled and len(enrolled) >= max_subjects:
             break
 
         enrolled.setdefault(subject, set())
 
-        if len(enrolled[subject]) >= MAX_FINGERS:
+        if len(enrolled[subject]) >= max_fingers:
             continue
 
         img = cv2.imread(file, cv2.IMREAD_GRAYSCALE)
@@ -72,25 +61,26 @@ def enroll():
         if len(minutiae) < 5:
             continue
 
-        minutiae = [
-            (int(x), int(y),
-             [float(a) for a in orient] if isinstance(orient, list) else float(orient),
-             typ)
-            for x, y, orient, typ in minutiae
-        ]
-
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute(
-            "INSERT OR REPLACE INTO templates VALUES (?, ?, ?)",
-            (subject, finger, json.dumps(minutiae).encode())
-        )
-        conn.commit()
-        conn.close()
+        yield subject, finger, minutiae
 
         enrolled[subject].add(finger)
+
+
+def _report_committed(keys):
+    for subject, finger in keys:
         print(f"Enrolled subject {subject}, finger {finger}")
 
 
+def enroll(dataset_path=DATASET_PATH, db_path=DB_PATH, max_subjects=MAX_SUBJECTS,
+           max_fingers=MAX_FINGERS):
+    init_db(db_path)
+    # Templates are written in small transactions as they are extracted and
+    # only reported once committed
+    return storage.upsert_templates(
+        iter_enrollments(dataset_path, max_subjects, max_fingers), db_path,
+        batch_size=BATCH_SIZE, on_commit=_report_committed
+    )
+
+
 if __name__ == "__main__":
     enroll()
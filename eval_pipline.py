@@ -1,36 +1,24 @@
-import sqlite3
-import json
+import storage
 
 def load_templates(db_path='fingerprints.db'):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT user_id, minutiae FROM templates")
-    data = cursor.fetchall()
-    conn.close()
-
-    templates = {}
-    for user_id, blob in data:
-        templates[user_id] = json.loads(blob.decode())
-    return templates
+    return storage.load_templates(db_path)
 
 import cv2
 import glob
 import numpy as np
 from feature_extractor import extract_minutiae
-from matcher import compute_confidence   # your matcher file
+from matcher import identify_many   # your matcher file
 
 def identify(query_minutiae, templates):
-    scores = []
-    for user_id, tmpl_minutiae in templates.items():
-        score = compute_confidence(query_minutiae, tmpl_minutiae)
-        scores.append((user_id, score))
-    scores.sort(key=lambda x: x[1], reverse=True)
-    return scores
+    keys = list(templates)
+    top_idx, top_scores = identify_many([query_minutiae], templates, top_k=len(keys), workers=1)
+    return [(keys[i], float(s)) for i, s in zip(top_idx[0], top_scores[0])]
 
 
 def evaluate_identification(probe_files, templates, rank_k=[1, 5, 10]):
-    correct_at_k = {k: 0 for k in rank_k}
-    total = 0
+    keys = list(templates)
+    true_ids = []
+    queries = []
 
     for file in probe_files:
         img = cv2.imread(file, cv2.IMREAD_GRAYSCALE)
@@ -45,27 +33,40 @@ def evaluate_identification(probe_files, templates, rank_k=[1, 5, 10]):
         if len(query_minutiae) < 5:
             continue
 
-        ranked = identify(query_minutiae, templates)
-        total += 1
+        true_ids.append(true_id)
+        queries.append(query_minutiae)
+
+    # Rank all probes in one gallery pass
+    top_idx, _ = identify_many(queries, templates, top_k=max(rank_k))
+    total = len(queries)
 
+    correct_at_k = {k: 0 for k in rank_k}
+    for true_id, row in zip(true_ids, top_idx):
+        # Gallery keys are (subject_id, finger_id); identity is the subject
+        ranked = [keys[i][0] for i in row]
         for k in rank_k:
-            top_k = [r[0] for r in ranked[:k]]
-            if true_id in top_k:
+            if true_id in ranked[:k]:
                 correct_at_k[k] += 1
 
     accuracy = {k: correct_at_k[k] / total for k in rank_k}
     return accuracy, total
 
 
-templates = load_templates('fingerprints.db')
+def main(db_path='fingerprints.db', probe_glob='SOCOFing/Real/*.BMP', rank_k=(1, 5, 10)):
+    templates = load_templates(db_path)
+
+    probe_files = glob.glob(probe_glob)
+
+    acc, total = evaluate_identification(probe_files, templates, rank_k)
 
-probe_files = glob.glob('SOCOFing/Real/*.BMP')
+    print(f"Total probes: {total}")
+    for k, v in acc.items():
+        print(f"Rank-{k} Accuracy: {v*100:.2f}%")
+    return acc, total
 
-acc, total = evaluate_identification(probe_files, templates)
 
-print(f"Total probes: {total}")
-for k, v in acc.items():
-    print(f"Rank-{k} Accuracy: {v*100:.2f}%")
+if __name__ == "__main__":
+    main()
 
 
 
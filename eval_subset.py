@@ -1,11 +1,10 @@
 # evaluate_altered.py
 import cv2
 import glob
-import json
-import sqlite3
 import os
 from feature_extractor import extract_minutiae
-from matcher import compute_confidence
+from matcher import identify_many
+import storage
 
 DB_PATH = "fingerprints.db"
 ALTERED_PATH = "SOKOTO/socofing/SOCOFing/Altered/Altered-Easy"
@@ -29,38 +28,28 @@ def parse_socofing_name(path):
 
 
 # ---------- Load gallery ----------
-def load_templates():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT subject_id, finger_id, minutiae FROM templates")
-    rows = c.fetchall()
-    conn.close()
-
-    templates = {}
-    for subject, finger, blob in rows:
-        templates[(subject, finger)] = json.loads(blob.decode())
-    return templates
+def load_templates(db_path=DB_PATH):
+    return storage.load_templates(db_path)
 
 
 # ---------- Identification ----------
 def identify(query_minutiae, templates):
-    scores = []
-    for (subject, finger), tmpl in templates.items():
-        score = compute_confidence(query_minutiae, tmpl)
-        scores.append(((subject, finger), score))
-    scores.sort(key=lambda x: x[1], reverse=True)
-    return scores
+    keys = list(templates)
+    top_idx, top_scores = identify_many([query_minutiae], templates, top_k=len(keys), workers=1)
+    return [(keys[i], float(s)) for i, s in zip(top_idx[0], top_scores[0])]
 
 
 # ---------- Evaluation ----------
-def evaluate_altered(rank_k=(1, 5,10)):
-    templates = load_templates()
+def evaluate_altered(rank_k=(1, 5,10), db_path=DB_PATH, altered_path=ALTERED_PATH):
+    templates = load_templates(db_path)
+    keys = list(templates)
 
+    # Extract every probe first so all attacks are ranked in one gallery pass
+    probes = {}
+    queries = []
     for attack in ['CR', 'Obl', 'Zcut']:
-        files = glob.glob(f"{ALTERED_PATH}/*_{attack}.BMP")
-
-        correct = {k: 0 for k in rank_k}
-        total = 0
+        files = glob.glob(f"{altered_path}/*_{attack}.BMP")
+        probes[attack] = []
 
         for file in files:
             subject, finger, atk = parse_socofing_name(file)
@@ -77,12 +66,19 @@ def evaluate_altered(rank_k=(1, 5,10)):
             if len(query) < 5:
                 continue
 
-            ranked = identify(query, templates)
-            total += 1
+            probes[attack].append((len(queries), (subject, finger)))
+            queries.append(query)
+
+    top_idx, _ = identify_many(queries, templates, top_k=max(rank_k))
+
+    for attack in ['CR', 'Obl', 'Zcut']:
+        correct = {k: 0 for k in rank_k}
+        total = len(probes[attack])
 
+        for row, truth in probes[attack]:
+            ranked = [keys[i] for i in top_idx[row]]
             for k in rank_k:
-                top_k = [r[0] for r in ranked[:k]]
-                if (subject, finger) in top_k:
+                if truth in ranked[:k]:
                     correct[k] += 1
 
         print(f"\nAttack type: {attack}")
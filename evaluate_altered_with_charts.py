@@ -1,22 +1,19 @@
 # evaluate_altered_with_charts.py
 import cv2
 import glob
-import json
-import sqlite3
 import os
 import numpy as np
 import matplotlib.pyplot as plt
 from datetime import datetime
 from feature_extractor import extract_minutiae
-from matcher import compute_confidence
+from matcher import identify_many
+from score_stats import ScoreAccumulator, det_curve, equal_error_rate
+import storage
 
 DB_PATH = "fingerprints.db"
 ALTERED_PATH = "SOKOTO/socofing/SOCOFing/Altered/Altered-Easy"
 REPORT_DIR = "evaluation_reports"
 
-# Create report directory
-os.makedirs(REPORT_DIR, exist_ok=True)
-
 
 # ---------- Parser ----------
 def parse_socofing_name(path):
@@ -36,31 +33,19 @@ def parse_socofing_name(path):
 
 
 # ---------- Load gallery ----------
-def load_templates():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT subject_id, finger_id, minutiae FROM templates")
-    rows = c.fetchall()
-    conn.close()
-
-    templates = {}
-    for subject, finger, blob in rows:
-        templates[(subject, finger)] = json.loads(blob.decode())
-    return templates
+def load_templates(db_path=DB_PATH):
+    return storage.load_templates(db_path)
 
 
 # ---------- Identification ----------
 def identify(query_minutiae, templates):
-    scores = []
-    for (subject, finger), tmpl in templates.items():
-        score = compute_confidence(query_minutiae, tmpl)
-        scores.append(((subject, finger), score))
-    scores.sort(key=lambda x: x[1], reverse=True)
-    return scores
+    keys = list(templates)
+    top_idx, top_scores = identify_many([query_minutiae], templates, top_k=len(keys), workers=1)
+    return [(keys[i], float(s)) for i, s in zip(top_idx[0], top_scores[0])]
 
 
 # ---------- Plotting Functions ----------
-def plot_rank_accuracy(results, rank_k):
+def plot_rank_accuracy(results, rank_k, report_dir=REPORT_DIR):
     """Bar chart comparing rank accuracies across attack types."""
     fig, ax = plt.subplots(figsize=(10, 6))
     
@@ -83,11 +68,11 @@ def plot_rank_accuracy(results, rank_k):
     ax.set_ylim(0, 105)
     
     plt.tight_layout()
-    plt.savefig(f'{REPORT_DIR}/rank_accuracy_comparison.png', dpi=300, bbox_inches='tight')
+    plt.savefig(f'{report_dir}/rank_accuracy_comparison.png', dpi=300, bbox_inches='tight')
     plt.close()
 
 
-def plot_cumulative_match_curve(results, rank_k):
+def plot_cumulative_match_curve(results, rank_k, report_dir=REPORT_DIR):
     """CMC curve for each attack type."""
     fig, ax = plt.subplots(figsize=(10, 6))
     
@@ -105,22 +90,24 @@ def plot_cumulative_match_curve(results, rank_k):
     ax.set_xlim(rank_k[0], rank_k[-1])
     
     plt.tight_layout()
-    plt.savefig(f'{REPORT_DIR}/cmc_curve.png', dpi=300, bbox_inches='tight')
+    plt.savefig(f'{report_dir}/cmc_curve.png', dpi=300, bbox_inches='tight')
     plt.close()
 
 
-def plot_score_distribution(all_scores):
+def plot_score_distribution(all_scores, report_dir=REPORT_DIR):
     """Distribution of matching scores for genuine vs impostor comparisons."""
     fig, ax = plt.subplots(figsize=(12, 6))
     
     for attack, scores in all_scores.items():
-        genuine = scores['genuine']
-        impostor = scores['impostor']
+        genuine = scores['genuine'].histogram.rebin(20)
+        impostor = scores['impostor'].histogram.rebin(20)
         
-        if genuine:
-            ax.hist(genuine, bins=30, alpha=0.5, label=f'{attack} - Genuine', density=True)
-        if impostor:
-            ax.hist(impostor, bins=30, alpha=0.5, label=f'{attack} - Impostor', density=True)
+        if genuine.total:
+            ax.stairs(genuine.density(), genuine.edges, fill=True, alpha=0.5,
+                      label=f'{attack} - Genuine')
+        if impostor.total:
+            ax.stairs(impostor.density(), impostor.edges, fill=True, alpha=0.5,
+                      label=f'{attack} - Impostor')
     
     ax.set_xlabel('Matching Score', fontsize=12, fontweight='bold')
     ax.set_ylabel('Density', fontsize=12, fontweight='bold')
@@ -130,11 +117,44 @@ def plot_score_distribution(all_scores):
     ax.grid(True, alpha=0.3)
     
     plt.tight_layout()
-    plt.savefig(f'{REPORT_DIR}/score_distribution.png', dpi=300, bbox_inches='tight')
+    plt.savefig(f'{report_dir}/score_distribution.png', dpi=300, bbox_inches='tight')
     plt.close()
 
 
-def plot_per_attack_stats(results):
+def plot_det_curve(all_scores, report_dir=REPORT_DIR):
+    """Detection Error Tradeoff curve (FAR vs FRR on normal-deviate axes)."""
+    from scipy.stats import norm
+
+    fig, ax = plt.subplots(figsize=(8, 8))
+    
+    for attack, scores in all_scores.items():
+        if not scores['genuine'].count or not scores['impostor'].count:
+            continue
+        far, frr = det_curve(scores['genuine'], scores['impostor'])
+        far = np.clip(far, 1e-4, 1 - 1e-4)
+        frr = np.clip(frr, 1e-4, 1 - 1e-4)
+        ax.plot(norm.ppf(far), norm.ppf(frr), linewidth=2, label=attack)
+    
+    ticks = np.array([0.001, 0.01, 0.05, 0.2, 0.5, 0.8, 0.95])
+    ax.set_xticks(norm.ppf(ticks))
+    ax.set_xticklabels([f'{100 * t:g}' for t in ticks])
+    ax.set_yticks(norm.ppf(ticks))
+    ax.set_yticklabels([f'{100 * t:g}' for t in ticks])
+    ax.set_xlim(norm.ppf(5e-4), norm.ppf(0.995))
+    ax.set_ylim(norm.ppf(5e-4), norm.ppf(0.995))
+    ax.set_xlabel('False Acceptance Rate (%)', fontsize=12, fontweight='bold')
+    ax.set_ylabel('False Rejection Rate (%)', fontsize=12, fontweight='bold')
+    ax.set_title('Detection Error Tradeoff (DET) Curve', 
+                 fontsize=14, fontweight='bold')
+    ax.legend(fontsize=11)
+    ax.grid(True, alpha=0.3)
+    
+    plt.tight_layout()
+    plt.savefig(f'{report_dir}/det_curve.png', dpi=300, bbox_inches='tight')
+    plt.close()
+
+
+def plot_per_attack_stats(results, report_dir=REPORT_DIR):
     """Statistics per attack type: total probes and average scores."""
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 5))
     
@@ -165,11 +185,11 @@ def plot_per_attack_stats(results):
                 f'{height:.2f}', ha='center', va='bottom', fontweight='bold')
     
     plt.tight_layout()
-    plt.savefig(f'{REPORT_DIR}/attack_statistics.png', dpi=300, bbox_inches='tight')
+    plt.savefig(f'{report_dir}/attack_statistics.png', dpi=300, bbox_inches='tight')
     plt.close()
 
 
-def plot_confusion_heatmap(results, rank_k):
+def plot_confusion_heatmap(results, rank_k, report_dir=REPORT_DIR):
     """Heatmap showing rank-1 success rate breakdown."""
     fig, ax = plt.subplots(figsize=(8, 6))
     
@@ -201,15 +221,15 @@ def plot_confusion_heatmap(results, rank_k):
     
     plt.colorbar(im, ax=ax)
     plt.tight_layout()
-    plt.savefig(f'{REPORT_DIR}/rank1_breakdown.png', dpi=300, bbox_inches='tight')
+    plt.savefig(f'{report_dir}/rank1_breakdown.png', dpi=300, bbox_inches='tight')
     plt.close()
 
 
-def generate_summary_report(results, rank_k):
+def generate_summary_report(results, rank_k, report_dir=REPORT_DIR):
     """Generate text summary report."""
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
-    with open(f'{REPORT_DIR}/evaluation_summary.txt', 'w') as f:
+    with open(f'{report_dir}/evaluation_summary.txt', 'w') as f:
         f.write("=" * 70 + "\n")
         f.write("FINGERPRINT IDENTIFICATION EVALUATION REPORT\n")
         f.write(f"Generated: {timestamp}\n")
@@ -220,7 +240,17 @@ def generate_summary_report(results, rank_k):
             f.write(f"Attack Type: {attack}\n")
             f.write(f"{'='*50}\n")
             f.write(f"Total Probe Images: {results[attack]['total']}\n")
-            f.write(f"Average Genuine Score: {results[attack]['avg_genuine_score']:.4f}\n\n")
+            f.write(f"Average Genuine Score: {results[attack]['avg_genuine_score']:.4f}\n")
+            for kind in ('genuine', 'impostor'):
+                stats = results[attack]['score_stats'][kind]
+                f.write(f"{kind.capitalize()} Scores: n={stats['count']}, "
+                        f"mean={stats['mean']:.4f}, std={stats['std']:.4f}, "
+                        f"median={stats['median']:.4f}, p99={stats['p99']:.4f}\n")
+            if np.isnan(results[attack]['eer']):
+                f.write("EER: n/a (no genuine or impostor scores)\n\n")
+            else:
+                f.write(f"EER: {100 * results[attack]['eer']:.2f}% "
+                        f"at threshold {results[attack]['eer_threshold']:.3f}\n\n")
             
             f.write("Rank-k Accuracy:\n")
             for k in rank_k:
@@ -242,19 +272,22 @@ def generate_summary_report(results, rank_k):
 
 
 # ---------- Evaluation with Data Collection ----------
-def evaluate_altered(rank_k=(1, 5, 10)):
-    templates = load_templates()
+def evaluate_altered(rank_k=(1, 5, 10), db_path=DB_PATH, altered_path=ALTERED_PATH,
+                     report_dir=REPORT_DIR):
+    os.makedirs(report_dir, exist_ok=True)
+    templates = load_templates(db_path)
+    keys = list(templates)
+    key_index = {key: i for i, key in enumerate(keys)}
     
     results = {}
     all_scores = {}
 
+    # Extract every probe first so all attacks are scored in one gallery pass
+    probes = {}
+    queries = []
     for attack in ['CR', 'Obl', 'Zcut']:
-        files = glob.glob(f"{ALTERED_PATH}/*_{attack}.BMP")
-
-        correct = {k: 0 for k in rank_k}
-        total = 0
-        genuine_scores = []
-        impostor_scores = []
+        files = glob.glob(f"{altered_path}/*_{attack}.BMP")
+        probes[attack] = []
 
         for file in files:
             subject, finger, atk = parse_socofing_name(file)
@@ -270,34 +303,63 @@ def evaluate_altered(rank_k=(1, 5, 10)):
             if len(query) < 5:
                 continue
 
-            ranked = identify(query, templates)
-            total += 1
+            probes[attack].append((len(queries), (subject, finger)))
+            queries.append(query)
+
+    # Per-probe attack and genuine gallery column, for routing streamed scores
+    row_attack = np.empty(len(queries), dtype=object)
+    row_genuine = np.empty(len(queries), dtype=np.int64)
+    for attack, rows in probes.items():
+        for row, truth in rows:
+            row_attack[row] = attack
+            row_genuine[row] = key_index[truth]
+
+    for attack in probes:
+        all_scores[attack] = {'genuine': ScoreAccumulator(), 'impostor': ScoreAccumulator()}
+
+    def collect(q0, q1, g0, g1, scores):
+        is_genuine = row_genuine[q0:q1, None] == np.arange(g0, g1)[None, :]
+        for attack in set(row_attack[q0:q1]):
+            rows = row_attack[q0:q1] == attack
+            all_scores[attack]['genuine'].add(scores[rows][is_genuine[rows]])
+            all_scores[attack]['impostor'].add(scores[rows][~is_genuine[rows]])
 
-            # Collect scores
-            for (subj, fing), score in ranked:
-                if (subj, fing) == (subject, finger):
-                    genuine_scores.append(score)
-                else:
-                    impostor_scores.append(score)
+    # Scores are streamed into fixed-size accumulators instead of kept per comparison
+    top_idx, _ = identify_many(queries, templates, top_k=max(rank_k), on_block=collect)
 
+    for attack in ['CR', 'Obl', 'Zcut']:
+        correct = {k: 0 for k in rank_k}
+        total = len(probes[attack])
+
+        for row, truth in probes[attack]:
             # Check rank accuracy
+            ranked = [keys[i] for i in top_idx[row]]
             for k in rank_k:
-                top_k = [r[0] for r in ranked[:k]]
-                if (subject, finger) in top_k:
+                if truth in ranked[:k]:
                     correct[k] += 1
 
         # Store results
+        genuine = all_scores[attack]['genuine']
+        impostor = all_scores[attack]['impostor']
+        eer, eer_threshold = equal_error_rate(genuine, impostor)
         accuracy = {k: 100 * correct[k] / total if total > 0 else 0 for k in rank_k}
         results[attack] = {
             'total': total,
             'correct': correct,
             'accuracy': accuracy,
-            'avg_genuine_score': np.mean(genuine_scores) if genuine_scores else 0
-        }
-        
-        all_scores[attack] = {
-            'genuine': genuine_scores,
-            'impostor': impostor_scores[:len(genuine_scores)*10]  # Subsample for visualization
+            'avg_genuine_score': genuine.mean if genuine.count else 0,
+            'eer': eer,
+            'eer_threshold': eer_threshold,
+            'score_stats': {
+                kind: {
+                    'count': acc.count,
+                    'mean': acc.mean,
+                    'std': acc.std,
+                    'median': float(acc.quantile(0.5)),
+                    'p99': float(acc.quantile(0.99)),
+                }
+                for kind, acc in (('genuine', genuine), ('impostor', impostor))
+            },
         }
 
         # Print to console
@@ -311,25 +373,28 @@ def evaluate_altered(rank_k=(1, 5, 10)):
     print("Generating evaluation reports...")
     print("="*50)
     
-    plot_rank_accuracy(results, rank_k)
+    plot_rank_accuracy(results, rank_k, report_dir)
     print(f"✓ Saved: rank_accuracy_comparison.png")
     
-    plot_cumulative_match_curve(results, rank_k)
+    plot_cumulative_match_curve(results, rank_k, report_dir)
     print(f"✓ Saved: cmc_curve.png")
     
-    plot_score_distribution(all_scores)
+    plot_score_distribution(all_scores, report_dir)
     print(f"✓ Saved: score_distribution.png")
     
-    plot_per_attack_stats(results)
+    plot_det_curve(all_scores, report_dir)
+    print(f"✓ Saved: det_curve.png")
+    
+    plot_per_attack_stats(results, report_dir)
     print(f"✓ Saved: attack_statistics.png")
     
-    plot_confusion_heatmap(results, rank_k)
+    plot_confusion_heatmap(results, rank_k, report_dir)
     print(f"✓ Saved: rank1_breakdown.png")
     
-    generate_summary_report(results, rank_k)
+    generate_summary_report(results, rank_k, report_dir)
     print(f"✓ Saved: evaluation_summary.txt")
     
-    print(f"\nAll reports saved to '{REPORT_DIR}/' directory")
+    print(f"\nAll reports saved to '{report_dir}/' directory")
 
 
 if __name__ == "__main__":
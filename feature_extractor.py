@@ -2,6 +2,7 @@ import cv2
 import numpy as np
 from skimage.morphology import skeletonize
 import math
+from minutiae import MinutiaeSet, TERMINATION, BIFURCATION
 
 def preprocess_image(img):
     """Enhance and binarize 192x92 image."""
@@ -33,37 +34,63 @@ def get_ridge_orientation(thinned, x, y, window_size=3):
     except:
         return np.nan
 
+def crossing_numbers(thinned):
+    """Crossing number of every interior pixel of a 0/255 skeleton.
+
+    Counts 0->1 transitions around the 8-neighbourhood (1 = termination,
+    3 = bifurcation). Border pixels are returned as 0.
+    """
+    ridge = (thinned // 255).astype(np.int8)
+    rows, cols = ridge.shape
+    # Neighbours in ring order: NW, N, NE, E, SE, S, SW, W
+    ring = [ridge[di:rows - 2 + di, dj:cols - 2 + dj]
+            for di, dj in ((0, 0), (0, 1), (0, 2), (1, 2), (2, 2), (2, 1), (2, 0), (1, 0))]
+    transitions = sum(np.abs(ring[k] - ring[(k + 1) % 8]) for k in range(8)) // 2
+    out = np.zeros((rows, cols), dtype=np.int8)
+    out[1:-1, 1:-1] = transitions
+    return out
+
+
 def extract_minutiae(img):
-    """Extract minutiae, handling scalar/list orientations."""
+    """Extract minutiae as a MinutiaeSet (see minutiae.py)."""
     
     thinned = preprocess_image(img)
-    minutiae = []
     rows, cols = thinned.shape
+    transitions = crossing_numbers(thinned)
     
-    for i in range(1, rows-1):
-        for j in range(1, cols-1):
-            if thinned[i, j] == 255:
-                neighbors = np.array([
-                    thinned[i-1, j-1], thinned[i-1, j], thinned[i-1, j+1],
-                    thinned[i, j+1], thinned[i+1, j+1], thinned[i+1, j],
-                    thinned[i+1, j-1], thinned[i, j-1]
-                ], dtype=np.uint8)
-                transitions = np.sum(np.abs((neighbors // 255).astype(np.int8) - 
-                                          np.roll(neighbors // 255, -1).astype(np.int8))) // 2
-                orientation = get_ridge_orientation(thinned, j, i)
-                if transitions == 1 and isinstance(orientation, float) and not np.isnan(orientation):
-                    minutiae.append((np.int16(j), np.int16(i), orientation, 'Termination'))
-                elif transitions == 3 and isinstance(orientation, list) and not np.any(np.isnan(orientation)):
-                    minutiae.append((np.int16(j), np.int16(i), orientation, 'Bifurcation'))
+    xy, kind, angles = [], [], []
+    # Only ridge pixels with a termination/bifurcation crossing number need an orientation
+    candidates = (thinned == 255) & ((transitions == 1) | (transitions == 3))
+    for i, j in zip(*np.nonzero(candidates)):
+        orientation = get_ridge_orientation(thinned, j, i)
+        if transitions[i, j] == 1 and isinstance(orientation, float) and not np.isnan(orientation):
+            kind.append(TERMINATION)
+            angles.append((orientation, np.nan, np.nan))
+        elif transitions[i, j] == 3 and isinstance(orientation, list) and not np.any(np.isnan(orientation)):
+            kind.append(BIFURCATION)
+            angles.append(orientation)
+        else:
+            continue
+        xy.append((j, i))
+    
+    if not xy:
+        return MinutiaeSet.empty()
+    xy = np.array(xy, dtype=np.int16)
+    kind = np.array(kind, dtype=np.uint8)
+    angles = np.array(angles, dtype=np.float64)
     
     # Relaxed filtering for 192x92
-    minutiae = [m for m in minutiae if 3 < m[0] < cols-3 and 3 < m[1] < rows-3]
-    unique_minutiae = []
-    for m in minutiae:
-        if all(np.linalg.norm(np.array(m[:2]) - np.array(u[:2])) > 4 for u in unique_minutiae):
-            unique_minutiae.append(m)
+    inside = (xy[:, 0] > 3) & (xy[:, 0] < cols-3) & (xy[:, 1] > 3) & (xy[:, 1] < rows-3)
+    xy, kind, angles = xy[inside], kind[inside], angles[inside]
+    
+    # Greedy spatial de-duplication: keep a minutia only if > 4 px from all kept ones
+    points = xy.astype(np.float64)
+    keep = []
+    for idx in range(len(points)):
+        if not keep or np.all(np.hypot(*(points[keep] - points[idx]).T) > 4):
+            keep.append(idx)
     
     # Debug: Save thinned image and print minutiae
     # cv2.imwrite('thinned.png', thinned)
-    # print(f"Extracted {len(unique_minutiae)} minutiae: {unique_minutiae}")
-    return unique_minutiae
\ No newline at end of file
+    # print(f"Extracted {len(keep)} minutiae")
+    return MinutiaeSet(xy[keep], kind[keep], angles[keep])
@@ -0,0 +1,52 @@
+# gallery.py
+from collections.abc import Mapping
+
+import storage
+
+
+class Gallery(Mapping):
+    """In-memory copy of the templates table that refreshes incrementally.
+
+    Behaves as a read-only {(subject_id, finger_id): minutiae} mapping, so it
+    can be passed straight to matcher.identify_many. refresh() applies only
+    the templates written since the last load, using the change log kept by
+    storage.
+    """
+
+    def __init__(self, db_path=storage.DB_PATH):
+        self.db_path = db_path
+        self.revision = 0
+        self._templates = {}
+        self.reload()
+
+    def reload(self):
+        """Replace the in-memory gallery with a full read of the table."""
+        self.revision, self._templates = storage.load_snapshot(self.db_path)
+
+    def refresh(self):
+        """Apply inserts, replacements and deletions since the last refresh.
+
+        Returns the number of templates that changed, or None if the change
+        log had been pruned past our revision and a full reload was done.
+        """
+        revision, changes = storage.changes_since(self.revision, self.db_path)
+        if changes is None:
+            self.reload()
+            return None
+
+        for key, minutiae in changes.items():
+            if minutiae is None:
+                self._templates.pop(key, None)
+            else:
+                self._templates[key] = minutiae
+        self.revision = revision
+        return len(changes)
+
+    def __getitem__(self, key):
+        return self._templates[key]
+
+    def __iter__(self):
+        return iter(self._templates)
+
+    def __len__(self):
+        return len(self._templates)
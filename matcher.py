@@ -1,54 +1,163 @@
 import numpy as np
-import math
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from minutiae import MinutiaeSet
 
 def to_polar(minutiae, ref_idx):
-    """Convert to polar coordinates."""
-    ref_x, ref_y, ref_orient, _ = minutiae[ref_idx]
-    ref_theta = ref_orient[0] if isinstance(ref_orient, list) else ref_orient
-    polar = []
-    for i, (x, y, orient, typ) in enumerate(minutiae):
-        if i == ref_idx:
-            continue
-        dx, dy = x - ref_x, y - ref_y
-        r = math.sqrt(dx**2 + dy**2)
-        phi = math.atan2(dy, dx) * 180 / math.pi
-        theta = orient[0] if isinstance(orient, list) else orient
-        theta_rel = (theta - ref_theta + 360) % 360
-        polar.append((r, phi, theta_rel, typ))
-    return polar
+    """Convert to polar coordinates around minutia `ref_idx`.
+
+    Returns (r, phi, theta_rel, kind) arrays for every other minutia.
+    """
+    minutiae = MinutiaeSet.from_tuples(minutiae)
+    others = np.arange(len(minutiae)) != ref_idx
+    xy = minutiae.xy.astype(np.float64)
+    theta = minutiae.theta.astype(np.float64)
+    dx, dy = (xy[others] - xy[ref_idx]).T
+    r = np.hypot(dx, dy)
+    phi = np.degrees(np.arctan2(dy, dx))
+    theta_rel = (theta[others] - theta[ref_idx] + 360) % 360
+    return r, phi, theta_rel, minutiae.kind[others]
 
 def match_polar(q_polar, t_polar, dist_thresh=12, angle_thresh=25):
-    """Pair minutiae."""
+    """Pair minutiae greedily: each query takes the first free compatible template."""
+    q_r, q_phi, q_theta, q_kind = q_polar
+    t_r, t_phi, t_theta, t_kind = t_polar
+    compatible = ((np.abs(q_r[:, None] - t_r[None, :]) <= dist_thresh)
+                  & (np.abs(q_phi[:, None] - t_phi[None, :]) <= angle_thresh)
+                  & (np.abs(q_theta[:, None] - t_theta[None, :]) <= angle_thresh)
+                  & (q_kind[:, None] == t_kind[None, :]))
     matched = 0
-    used = set()
-    for q_r, q_phi, q_theta, q_typ in q_polar:
-        for t_idx, (t_r, t_phi, t_theta, t_typ) in enumerate(t_polar):
-            if t_idx in used:
-                continue
-            if abs(q_r - t_r) <= dist_thresh and abs(q_phi - t_phi) <= angle_thresh and abs(q_theta - t_theta) <= angle_thresh and q_typ == t_typ:
-                matched += 1
-                used.add(t_idx)
-                break
+    free = np.ones(len(t_r), dtype=bool)
+    for row in compatible[compatible.any(axis=1)]:
+        candidates = row & free
+        if candidates.any():
+            free[candidates.argmax()] = False
+            matched += 1
     return matched
 
+def _reference_order(minutiae):
+    """Indices sorted by distance to the centroid (ties keep input order)."""
+    xy = minutiae.xy.astype(np.float64)
+    dist = np.hypot(*(xy - xy.mean(axis=0)).T)
+    return np.argsort(dist, kind='stable')
+
 def compute_confidence(query_minutiae, template_minutiae, dist_thresh=15, angle_thresh=30):
     """Compute normalized confidence score."""
-    if not query_minutiae or not template_minutiae:
+    if not len(query_minutiae) or not len(template_minutiae):
         return 0.0
+    query_minutiae = MinutiaeSet.from_tuples(query_minutiae)
+    template_minutiae = MinutiaeSet.from_tuples(template_minutiae)
     
-    q_centroid = np.mean([p[:2] for p in query_minutiae], axis=0)
-    q_sorted = sorted(range(len(query_minutiae)), key=lambda i: np.linalg.norm(np.array(query_minutiae[i][:2]) - q_centroid))
-    
-    t_centroid = np.mean([p[:2] for p in template_minutiae], axis=0)
-    t_sorted = sorted(range(len(template_minutiae)), key=lambda i: np.linalg.norm(np.array(template_minutiae[i][:2]) - t_centroid))
+    q_sorted = _reference_order(query_minutiae)
+    t_sorted = _reference_order(template_minutiae)
     
+    t_polars = [to_polar(template_minutiae, t_ref) for t_ref in t_sorted[:3]]
     best_matched = 0
     for q_ref in q_sorted[:3]:
         q_polar = to_polar(query_minutiae, q_ref)
-        for t_ref in t_sorted[:3]:
-            t_polar = to_polar(template_minutiae, t_ref)
+        for t_polar in t_polars:
             matched = match_polar(q_polar, t_polar, dist_thresh, angle_thresh)
             best_matched = max(best_matched, matched)
     
-    score = (best_matched ** 2) / (len(query_minutiae) * len(template_minutiae)) if query_minutiae and template_minutiae else 0
-    return min(score, 1.0)
\ No newline at end of file
+    score = (best_matched ** 2) / (len(query_minutiae) * len(template_minutiae))
+    return min(score, 1.0)
+
+
+# ---------- Batch identification ----------
+_WORKER_STATE = {}
+
+
+def _init_worker(queries, templates, match_kwargs):
+    """Hold probes and gallery in the worker so tiles only ship index ranges."""
+    _WORKER_STATE['queries'] = queries
+    _WORKER_STATE['templates'] = templates
+    _WORKER_STATE['match_kwargs'] = match_kwargs
+
+
+def _score_tile(queries, templates, q0, q1, g0, g1, match_kwargs):
+    """Score a block of probes against a block of templates."""
+    scores = np.empty((q1 - q0, g1 - g0), dtype=np.float64)
+    for i in range(q0, q1):
+        query = queries[i]
+        for j in range(g0, g1):
+            scores[i - q0, j - g0] = compute_confidence(query, templates[j], **match_kwargs)
+    return q0, q1, g0, g1, scores
+
+
+def _score_tile_worker(q0, q1, g0, g1):
+    return _score_tile(_WORKER_STATE['queries'], _WORKER_STATE['templates'],
+                       q0, q1, g0, g1, _WORKER_STATE['match_kwargs'])
+
+
+def pool_size(n_queries, n_gallery, workers=None, probe_block=16, gallery_block=256):
+    """Worker processes identify_many starts for this batch (<= 1 means it runs inline)."""
+    n_tiles = -(-n_queries // probe_block) * -(-n_gallery // gallery_block)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    return min(workers, n_tiles)
+
+
+def identify_many(queries, gallery, top_k=10, return_scores=False, workers=None,
+                  probe_block=16, gallery_block=256, on_block=None, **match_kwargs):
+    """Rank many queries against a gallery in a single pass.
+
+    Probes and templates are scored in (probe_block x gallery_block) tiles,
+    spread over `workers` processes (all cores by default, 1 runs inline).
+    `gallery` is a mapping or a sequence of templates; returned indices refer
+    to its iteration order, ties keep gallery order like `sorted(..., reverse=True)`.
+
+    Returns (top_idx, top_scores), each of shape (len(queries), min(top_k, len(gallery))),
+    plus the full (len(queries), len(gallery)) score matrix if return_scores is set.
+    `on_block(q0, q1, g0, g1, scores)` is called in this process as each tile
+    completes, so callers can stream every score without keeping the matrix.
+    """
+    queries = [MinutiaeSet.from_tuples(q) for q in queries]
+    templates = [MinutiaeSet.from_tuples(t)
+                 for t in (gallery.values() if hasattr(gallery, 'values') else gallery)]
+    n_q, n_g = len(queries), len(templates)
+    k = min(top_k, n_g)
+
+    best_idx = np.full((n_q, k), -1, dtype=np.int64)
+    best_scores = np.full((n_q, k), -np.inf, dtype=np.float64)
+    full = np.zeros((n_q, n_g), dtype=np.float64) if return_scores else None
+
+    def merge(q0, q1, g0, g1, scores):
+        if on_block is not None:
+            on_block(q0, q1, g0, g1, scores)
+        if full is not None:
+            full[q0:q1, g0:g1] = scores
+        idx = np.concatenate([best_idx[q0:q1], np.broadcast_to(np.arange(g0, g1), scores.shape)], axis=1)
+        sc = np.concatenate([best_scores[q0:q1], scores], axis=1)
+        # Sort by score descending, then by gallery index so tiles can finish in any order
+        order = np.lexsort((np.where(idx < 0, n_g, idx), -sc), axis=1)[:, :k]
+        best_idx[q0:q1] = np.take_along_axis(idx, order, axis=1)
+        best_scores[q0:q1] = np.take_along_axis(sc, order, axis=1)
+
+    tiles = [(q0, min(q0 + probe_block, n_q), g0, min(g0 + gallery_block, n_g))
+             for q0 in range(0, n_q, probe_block)
+             for g0 in range(0, n_g, gallery_block)]
+
+    workers = pool_size(n_q, n_g, workers, probe_block, gallery_block)
+
+    if workers <= 1:
+        for tile in tiles:
+            merge(*_score_tile(queries, templates, *tile, match_kwargs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(queries, templates, match_kwargs)) as pool:
+            # Keep only a few tiles in flight so finished score blocks are merged
+            # and dropped instead of piling up as a probes x gallery matrix
+            pending = set()
+            for tile in tiles:
+                pending.add(pool.submit(_score_tile_worker, *tile))
+                if len(pending) < 2 * workers:
+                    continue
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    merge(*future.result())
+            for future in pending:
+                merge(*future.result())
+
+    if return_scores:
+        return best_idx, best_scores, full
+    return best_idx, best_scores
@@ -0,0 +1,117 @@
+# minutiae.py
+import struct
+
+import numpy as np
+
+TERMINATION = 0
+BIFURCATION = 1
+TYPE_NAMES = ('Termination', 'Bifurcation')
+TYPE_CODES = {name: code for code, name in enumerate(TYPE_NAMES)}
+
+_MAGIC = b'MNT1'
+_HEADER = struct.Struct('<4sI')
+
+
+class MinutiaeSet:
+    """Minutiae stored as contiguous arrays instead of per-minutia tuples.
+
+    xy      (N, 2) int16   column, row
+    kind    (N,)   uint8   TERMINATION or BIFURCATION
+    angles  (N, 3) float32 ridge orientation(s) in degrees; terminations
+                           only use the first column, the rest is NaN
+
+    Iterating or indexing with an int still yields the legacy
+    (x, y, orientation, type) tuples, where orientation is a float for
+    terminations and a list of three floats for bifurcations.
+    """
+
+    __slots__ = ('xy', 'kind', 'angles')
+
+    def __init__(self, xy, kind, angles):
+        self.xy = np.ascontiguousarray(xy, dtype=np.int16).reshape(-1, 2)
+        self.kind = np.ascontiguousarray(kind, dtype=np.uint8).reshape(-1)
+        self.angles = np.ascontiguousarray(angles, dtype=np.float32).reshape(-1, 3)
+        if not len(self.xy) == len(self.kind) == len(self.angles):
+            raise ValueError("xy, kind and angles must have the same length.")
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty((0, 2)), np.empty(0), np.empty((0, 3)))
+
+    @classmethod
+    def from_tuples(cls, minutiae):
+        """Build from (x, y, orientation, type) tuples, e.g. legacy JSON templates."""
+        if isinstance(minutiae, cls):
+            return minutiae
+        minutiae = list(minutiae)
+        if not minutiae:
+            return cls.empty()
+        xy = np.empty((len(minutiae), 2), dtype=np.int16)
+        kind = np.empty(len(minutiae), dtype=np.uint8)
+        angles = np.full((len(minutiae), 3), np.nan, dtype=np.float32)
+        for i, (x, y, orient, typ) in enumerate(minutiae):
+            xy[i] = x, y
+            kind[i] = TYPE_CODES[typ]
+            if isinstance(orient, (list, tuple)):
+                angles[i, :len(orient)] = orient
+            else:
+                angles[i, 0] = orient
+        return cls(xy, kind, angles)
+
+    @property
+    def theta(self):
+        """Primary orientation of every minutia (first bifurcation branch)."""
+        return self.angles[:, 0]
+
+    def __len__(self):
+        return len(self.kind)
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            x, y = self.xy[index]
+            if self.kind[index] == BIFURCATION:
+                orient = [float(a) for a in self.angles[index]]
+            else:
+                orient = float(self.angles[index, 0])
+            return x, y, orient, TYPE_NAMES[self.kind[index]]
+        return MinutiaeSet(self.xy[index], self.kind[index], self.angles[index])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __eq__(self, other):
+        if not isinstance(other, MinutiaeSet):
+            return NotImplemented
+        return (np.array_equal(self.xy, other.xy)
+                and np.array_equal(self.kind, other.kind)
+                and np.array_equal(self.angles, other.angles, equal_nan=True))
+
+    def __repr__(self):
+        n_bif = int((self.kind == BIFURCATION).sum())
+        return f"MinutiaeSet({len(self)} minutiae, {n_bif} bifurcations)"
+
+    # ---------- Serialization ----------
+    def to_bytes(self):
+        """Compact binary encoding: header, then the three arrays back to back."""
+        return (_HEADER.pack(_MAGIC, len(self))
+                + self.xy.astype('<i2').tobytes()
+                + self.kind.tobytes()
+                + self.angles.astype('<f4').tobytes())
+
+    @classmethod
+    def from_bytes(cls, blob):
+        magic, n = _HEADER.unpack_from(blob)
+        if magic != _MAGIC:
+            raise ValueError("Not a MinutiaeSet blob.")
+        offset = _HEADER.size
+        xy = np.frombuffer(blob, dtype='<i2', count=2 * n, offset=offset)
+        offset += 4 * n
+        kind = np.frombuffer(blob, dtype=np.uint8, count=n, offset=offset)
+        offset += n
+        angles = np.frombuffer(blob, dtype='<f4', count=3 * n, offset=offset)
+        return cls(xy, kind, angles)
+
+    @staticmethod
+    def is_blob(blob):
+        return bytes(blob[:len(_MAGIC)]) == _MAGIC
@@ -0,0 +1,241 @@
+# score_stats.py
+import math
+
+import numpy as np
+
+
+# ---------- Accumulators ----------
+class ScoreHistogram:
+    """Fixed-bin histogram over [lo, hi]; out-of-range scores go to the end bins."""
+
+    def __init__(self, bins=1000, lo=0.0, hi=1.0):
+        self.lo, self.hi = lo, hi
+        self.edges = np.linspace(lo, hi, bins + 1)
+        self.counts = np.zeros(bins, dtype=np.int64)
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if not values.size:
+            return
+        bins = len(self.counts)
+        idx = np.floor((values - self.lo) / (self.hi - self.lo) * bins).astype(np.int64)
+        self.counts += np.bincount(np.clip(idx, 0, bins - 1), minlength=bins)
+
+    def merge(self, other):
+        self.counts += other.counts
+
+    def rebin(self, factor):
+        """Coarser copy with `factor` adjacent bins summed (for plotting)."""
+        out = ScoreHistogram(len(self.counts) // factor, self.lo, self.hi)
+        out.counts = self.counts[:len(out.counts) * factor].reshape(-1, factor).sum(axis=1)
+        return out
+
+    def density(self):
+        total = self.total
+        if not total:
+            return np.zeros_like(self.counts, dtype=np.float64)
+        return self.counts / (total * np.diff(self.edges))
+
+
+class RunningStats:
+    """Count, mean, variance, min and max, updated a batch at a time (Chan et al.)."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _combine(self, count, mean, m2, lo, hi):
+        if not count:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta ** 2 * self.count * count / total
+        self.count = total
+        self.min = min(self.min, lo)
+        self.max = max(self.max, hi)
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if not values.size:
+            return
+        mean = values.mean()
+        self._combine(values.size, mean, float(((values - mean) ** 2).sum()),
+                      values.min(), values.max())
+
+    def merge(self, other):
+        self._combine(other.count, other.mean, other.m2, other.min, other.max)
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+class TDigest:
+    """Merging t-digest for approximate quantiles in bounded memory.
+
+    Values are buffered and periodically merged into at most ~compression/2
+    weighted centroids, sized with the k1 scale function so the tails stay
+    accurate.
+    """
+
+    def __init__(self, compression=200, buffer_size=None):
+        self.compression = compression
+        self.buffer_size = buffer_size or 10 * compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer = []
+        self._buffered = 0
+
+    @property
+    def count(self):
+        return float(self.weights.sum()) + self._buffered
+
+    def _push(self, means, weights):
+        self._buffer.append((means, weights))
+        self._buffered += weights.sum()
+        if self._buffered >= self.buffer_size:
+            self._compress()
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if not values.size:
+            return
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self._push(values, np.ones(values.size))
+
+    def merge(self, other):
+        other._compress()
+        if other.weights.size:
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self._push(other.means, other.weights)
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        means = np.concatenate([self.means] + [m for m, _ in self._buffer])
+        weights = np.concatenate([self.weights] + [w for _, w in self._buffer])
+        self._buffer, self._buffered = [], 0
+
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        # k1(q) = compression / (2 pi) * asin(2q - 1); one centroid per unit of k
+        q = (np.cumsum(weights) - weights / 2) / weights.sum()
+        k = self.compression / (2 * math.pi) * np.arcsin(np.clip(2 * q - 1, -1, 1))
+        groups = np.floor(k).astype(np.int64)
+        groups -= groups[0]
+
+        self.weights = np.bincount(groups, weights)
+        keep = self.weights > 0
+        self.means = np.bincount(groups, weights * means)[keep] / self.weights[keep]
+        self.weights = self.weights[keep]
+
+    def quantile(self, q):
+        """Approximate quantile(s) for q in [0, 1]."""
+        self._compress()
+        if not self.weights.size:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else math.nan
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        xs = np.concatenate([[0.0], centers, [total]])
+        ys = np.concatenate([[self.min], self.means, [self.max]])
+        return np.interp(np.asarray(q) * total, xs, ys)
+
+
+class ScoreAccumulator:
+    """Histogram, running moments and quantile sketch for one score population."""
+
+    def __init__(self, bins=1000, lo=0.0, hi=1.0, compression=200):
+        self.histogram = ScoreHistogram(bins, lo, hi)
+        self.stats = RunningStats()
+        self.digest = TDigest(compression)
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        self.histogram.add(values)
+        self.stats.add(values)
+        self.digest.add(values)
+
+    def merge(self, other):
+        self.histogram.merge(other.histogram)
+        self.stats.merge(other.stats)
+        self.digest.merge(other.digest)
+
+    @property
+    def count(self):
+        return self.stats.count
+
+    @property
+    def mean(self):
+        return self.stats.mean
+
+    @property
+    def std(self):
+        return self.stats.std
+
+    def quantile(self, q):
+        return self.digest.quantile(q)
+
+
+# ---------- Error rates ----------
+def _histogram(scores):
+    return scores.histogram if isinstance(scores, ScoreAccumulator) else scores
+
+
+def far_frr(genuine, impostor):
+    """FAR and FRR at every bin edge of two histograms with identical bins.
+
+    A comparison is accepted when score >= threshold, so
+    FAR(t) = impostors accepted / impostors and FRR(t) = genuines rejected / genuines.
+    Returns (thresholds, far, frr); a rate is all NaN if its population is empty.
+    """
+    genuine, impostor = _histogram(genuine), _histogram(impostor)
+    if not np.array_equal(genuine.edges, impostor.edges):
+        raise ValueError("Histograms must share the same bins.")
+
+    # Counts at or above each edge / strictly below each edge
+    imp_above = np.concatenate([np.cumsum(impostor.counts[::-1])[::-1], [0]])
+    gen_below = np.concatenate([[0], np.cumsum(genuine.counts)])
+    far = imp_above / impostor.total if impostor.total else np.full(imp_above.shape, np.nan)
+    frr = gen_below / genuine.total if genuine.total else np.full(gen_below.shape, np.nan)
+    return genuine.edges, far, frr
+
+
+def equal_error_rate(genuine, impostor):
+    """Return (eer, threshold) where FAR and FRR cross, linearly interpolated.
+
+    Both are NaN when either population is empty.
+    """
+    thresholds, far, frr = far_frr(genuine, impostor)
+    if np.isnan(far[0]) or np.isnan(frr[0]):
+        return math.nan, math.nan
+    diff = far - frr                      # decreasing in the threshold
+    i = int(np.argmax(diff <= 0))
+    if i == 0:
+        return float(far[0] + frr[0]) / 2, float(thresholds[0])
+    d0, d1 = diff[i - 1], diff[i]
+    t = d0 / (d0 - d1) if d0 != d1 else 0.0
+    eer = far[i - 1] + t * (far[i] - far[i - 1])
+    threshold = thresholds[i - 1] + t * (thresholds[i] - thresholds[i - 1])
+    return float(eer), float(threshold)
+
+
+def det_curve(genuine, impostor):
+    """(far, frr) pairs for a Detection Error Tradeoff plot, one per threshold."""
+    _, far, frr = far_frr(genuine, impostor)
+    return far, frr
@@ -1,31 +1,31 @@
-import sqlite3
-import json
 from feature_extractor import extract_minutiae
 from matcher import compute_confidence
+from cache import LRUCache, image_digest, minutiae_digest
+from gallery import Gallery
+import storage
 import cv2
 
 
-def search_database(img, db_path='fingerprints.db', conf_threshold=0.3):
-    """Extract, match, return best ID and confidence."""
+def _extract_query(img):
     try:
         
         query_minutiae = extract_minutiae(img)
     except Exception as e:
         print(f"Extraction failed: {e}")
-        return None, 0.0
+        return None
     
     if not query_minutiae:
         print("No minutiae extracted from query.")
-        return None, 0.0
-    
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('SELECT user_id, minutiae FROM templates')
+        return None
+    return query_minutiae
+
+
+def _best_match(query_minutiae, templates, conf_threshold):
+    """Match against (user_id, minutiae) pairs; return best ID and confidence."""
     results = []
     max_conf = 0
-    for user_id, template_blob in cursor.fetchall():
+    for user_id, template_minutiae in templates:
         try:
-            template_minutiae = json.loads(template_blob.decode())
             conf = compute_confidence(query_minutiae, template_minutiae,dist_thresh=10,angle_thresh=30)
             max_conf = max_conf if conf < max_conf else conf
             if conf >= conf_threshold:
@@ -33,14 +33,85 @@ def search_database(img, db_path='fingerprints.db', conf_threshold=0.3):
         except Exception as e:
             print(f"Error matching {user_id}: {e}")
     
-    conn.close()
-    
     if not results:
         return None, max_conf
     
     results.sort(key=lambda x: x[1], reverse=True)
     return results[0][0], results[0][1]
 
+
+def search_database(img, db_path='fingerprints.db', conf_threshold=0.3):
+    """Extract, match, return best ID and confidence."""
+    query_minutiae = _extract_query(img)
+    if query_minutiae is None:
+        return None, 0.0
+
+    templates = ((user_id, minutiae) for user_id, _, minutiae in storage.iter_templates(db_path))
+    return _best_match(query_minutiae, templates, conf_threshold)
+
+
+def verify(img, subject_id, finger_id=None, db_path='fingerprints.db', conf_threshold=0.3):
+    """1:1 check of a claimed identity; return (accepted, confidence).
+
+    Matches against the claimed subject's templates only (one finger if
+    finger_id is given) and accepts on the best confidence.
+    """
+    query_minutiae = _extract_query(img)
+    if query_minutiae is None:
+        return False, 0.0
+
+    claimed = storage.load_subject(subject_id, db_path)
+    if finger_id is not None:
+        claimed = {finger_id: claimed[finger_id]} if finger_id in claimed else {}
+    if not claimed:
+        print(f"No template enrolled for {subject_id}.")
+        return False, 0.0
+
+    _, conf = _best_match(query_minutiae, ((subject_id, t) for t in claimed.values()), 0.0)
+    return conf >= conf_threshold, conf
+
+
+class Searcher:
+    """Warm searcher for long-running processes.
+
+    Keeps the gallery in memory and, before each search, applies only the
+    templates enrolled, replaced or deleted since the previous one.
+
+    Re-presented queries are served from two LRU caches: extraction output
+    keyed by the exact image digest, and match results keyed by the minutiae
+    digest. Results are dropped whenever the gallery revision changes.
+    """
+
+    def __init__(self, db_path='fingerprints.db', conf_threshold=0.3,
+                 cache_size=256, cache_ttl=30.0):
+        self.gallery = Gallery(db_path)
+        self.conf_threshold = conf_threshold
+        self.extractions = LRUCache(cache_size, cache_ttl)
+        self.results = LRUCache(cache_size, cache_ttl)
+
+    def search(self, img):
+        """Extract, match, return best ID and confidence."""
+        img_key = image_digest(img)
+        query_minutiae = self.extractions.get(img_key)
+        if query_minutiae is None:
+            query_minutiae = _extract_query(img)
+            if query_minutiae is None:
+                return None, 0.0
+            self.extractions.put(img_key, query_minutiae)
+
+        self.gallery.refresh()
+        self.results.set_revision(self.gallery.revision)
+        result_key = minutiae_digest(query_minutiae)
+        result = self.results.get(result_key)
+        if result is None:
+            templates = ((subject, minutiae) for (subject, _), minutiae in self.gallery.items())
+            result = _best_match(query_minutiae, templates, self.conf_threshold)
+            self.results.put(result_key, result)
+        return result
+
+    def cache_stats(self):
+        return {'extraction': self.extractions.stats(), 'results': self.results.stats()}
+
 if __name__ == "__main__":
     query_path = 'dataset/archive/socofing/SOCOFing/Altered/Altered-Easy/543__M_Left_index_finger_Zcut.BMP'
     img = cv2.imread(query_path, cv2.IMREAD_GRAYSCALE)
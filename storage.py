@@ -0,0 +1,338 @@
+# storage.py
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from minutiae import MinutiaeSet
+
+DB_PATH = "fingerprints.db"
+SCHEMA_VERSION = 2
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",        # readers never block the enrolling writer
+    "PRAGMA synchronous=NORMAL",      # safe with WAL, avoids an fsync per commit
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",       # 64 MiB page cache
+    "PRAGMA mmap_size=268435456",     # 256 MiB memory-mapped reads
+    "PRAGMA busy_timeout=30000",
+)
+
+# Change-log rows kept behind the latest revision. Writers trim older rows;
+# a gallery that falls further behind than this does one full reload.
+CHANGE_LOG_RETENTION = 100_000
+
+_local = threading.local()
+
+
+# ---------- Connections ----------
+def connect(db_path=DB_PATH):
+    """Return the calling thread's connection to db_path, opening it once.
+
+    Connections are cached per thread, so repeated calls are free and no
+    connection is ever shared across threads.
+    """
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    conn = connections.get(db_path)
+    if conn is None:
+        # Autocommit mode; writes go through transaction() explicitly
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        migrate(conn)
+        connections[db_path] = conn
+    return conn
+
+
+def close(db_path=None):
+    """Close the calling thread's connection(s)."""
+    connections = getattr(_local, 'connections', {})
+    paths = list(connections) if db_path is None else [db_path]
+    for path in paths:
+        conn = connections.pop(path, None)
+        if conn is not None:
+            conn.close()
+
+
+@contextmanager
+def transaction(conn, mode="IMMEDIATE"):
+    """Run a block inside BEGIN <mode> ... COMMIT, rolling back on error.
+
+    The default IMMEDIATE takes the write lock up front; DEFERRED gives
+    readers a consistent snapshot across several statements.
+    """
+    conn.execute(f"BEGIN {mode}")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+# ---------- Schema ----------
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _create_v1(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS templates (
+            subject_id TEXT NOT NULL,
+            finger_id TEXT NOT NULL DEFAULT '',
+            minutiae BLOB NOT NULL,
+            PRIMARY KEY (subject_id, finger_id)
+        )
+    """)
+
+
+def _migrate_v1(conn):
+    """Unify the two historical `templates` layouts.
+
+    enrollment.py stored (user_id, minutiae); enroll_subset.py stored
+    (subject_id, finger_id, minutiae). Legacy user_id rows become
+    subject_id=user_id with an empty finger_id.
+    """
+    columns = _columns(conn, 'templates')
+    if 'user_id' in columns:
+        conn.execute("ALTER TABLE templates RENAME TO templates_legacy")
+        _create_v1(conn)
+        conn.execute("""
+            INSERT OR REPLACE INTO templates (subject_id, finger_id, minutiae)
+            SELECT user_id, '', minutiae FROM templates_legacy
+        """)
+        conn.execute("DROP TABLE templates_legacy")
+    else:
+        _create_v1(conn)
+
+
+def _migrate_v2(conn):
+    """Add the change log that lets in-memory galleries refresh incrementally.
+
+    Triggers record every write to `templates`, so any writer (including
+    raw INSERT OR REPLACE) advances the revision. Rows present before the
+    migration are covered by the initial full load of a gallery.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS template_changes (
+            revision INTEGER PRIMARY KEY AUTOINCREMENT,
+            subject_id TEXT NOT NULL,
+            finger_id TEXT NOT NULL,
+            op TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS templates_log_insert AFTER INSERT ON templates
+        BEGIN
+            INSERT INTO template_changes (subject_id, finger_id, op)
+            VALUES (NEW.subject_id, NEW.finger_id, 'upsert');
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS templates_log_update AFTER UPDATE ON templates
+        BEGIN
+            INSERT INTO template_changes (subject_id, finger_id, op)
+            SELECT OLD.subject_id, OLD.finger_id, 'delete'
+            WHERE OLD.subject_id IS NOT NEW.subject_id OR OLD.finger_id IS NOT NEW.finger_id;
+            INSERT INTO template_changes (subject_id, finger_id, op)
+            VALUES (NEW.subject_id, NEW.finger_id, 'upsert');
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS templates_log_delete AFTER DELETE ON templates
+        BEGIN
+            INSERT INTO template_changes (subject_id, finger_id, op)
+            VALUES (OLD.subject_id, OLD.finger_id, 'delete');
+        END
+    """)
+
+
+MIGRATIONS = {
+    1: _migrate_v1,
+    2: _migrate_v2,
+}
+
+
+def migrate(conn):
+    """Bring the database schema up to SCHEMA_VERSION."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+    with transaction(conn):
+        # Re-read under the write lock in case another process migrated first
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for target in range(version + 1, SCHEMA_VERSION + 1):
+            MIGRATIONS[target](conn)
+        conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+
+def init_db(db_path=DB_PATH):
+    """Create or upgrade the templates store."""
+    connect(db_path)
+
+
+# ---------- Serialization ----------
+def encode_template(minutiae):
+    """Serialize minutiae to the binary MinutiaeSet blob stored in `templates.minutiae`."""
+    return MinutiaeSet.from_tuples(minutiae).to_bytes()
+
+
+def decode_template(blob):
+    """Decode a stored template; JSON blobs written before MinutiaeSet still load."""
+    if MinutiaeSet.is_blob(blob):
+        return MinutiaeSet.from_bytes(blob)
+    return MinutiaeSet.from_tuples(json.loads(bytes(blob).decode()))
+
+
+# ---------- Templates ----------
+def upsert_templates(rows, db_path=DB_PATH, batch_size=500, on_commit=None):
+    """Insert or replace (subject_id, finger_id, minutiae) rows.
+
+    Rows are encoded lazily and written with one prepared statement per
+    batch, each batch in its own transaction. `on_commit`, if given, is
+    called with the batch's (subject_id, finger_id) keys once it is durable
+    and visible to other connections. Returns the number written.
+    """
+    conn = connect(db_path)
+    sql = """
+        INSERT INTO templates (subject_id, finger_id, minutiae) VALUES (?, ?, ?)
+        ON CONFLICT (subject_id, finger_id) DO UPDATE SET minutiae = excluded.minutiae
+    """
+    written = 0
+    batch = []
+
+    def flush():
+        with transaction(conn):
+            conn.executemany(sql, batch)
+            _trim_change_log(conn)
+        if on_commit is not None:
+            on_commit([(subject_id, finger_id) for subject_id, finger_id, _ in batch])
+        return len(batch)
+
+    for subject_id, finger_id, minutiae in rows:
+        batch.append((subject_id, finger_id, encode_template(minutiae)))
+        if len(batch) >= batch_size:
+            written += flush()
+            batch = []
+    if batch:
+        written += flush()
+    return written
+
+
+def iter_templates(db_path=DB_PATH, batch_size=256):
+    """Stream (subject_id, finger_id, minutiae) rows without loading the table."""
+    cursor = connect(db_path).execute(
+        "SELECT subject_id, finger_id, minutiae FROM templates"
+    )
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for subject_id, finger_id, blob in rows:
+                yield subject_id, finger_id, decode_template(blob)
+    finally:
+        cursor.close()
+
+
+def load_templates(db_path=DB_PATH):
+    """Load the gallery as {(subject_id, finger_id): minutiae}."""
+    return {(subject, finger): minutiae
+            for subject, finger, minutiae in iter_templates(db_path)}
+
+
+def load_subject(subject_id, db_path=DB_PATH):
+    """Load one subject's templates as {finger_id: minutiae}."""
+    cursor = connect(db_path).execute(
+        "SELECT finger_id, minutiae FROM templates WHERE subject_id = ?", (subject_id,)
+    )
+    return {finger: decode_template(blob) for finger, blob in cursor}
+
+
+def load_snapshot(db_path=DB_PATH):
+    """Load (revision, templates) from a single consistent read."""
+    conn = connect(db_path)
+    with transaction(conn, "DEFERRED"):
+        revision = _current_revision(conn)
+        templates = load_templates(db_path)
+    return revision, templates
+
+
+def delete_templates(keys, db_path=DB_PATH):
+    """Delete templates by (subject_id, finger_id). Returns the number removed."""
+    conn = connect(db_path)
+    with transaction(conn):
+        cursor = conn.executemany(
+            "DELETE FROM templates WHERE subject_id = ? AND finger_id = ?", keys
+        )
+        _trim_change_log(conn)
+    return cursor.rowcount
+
+
+def count_templates(db_path=DB_PATH):
+    return connect(db_path).execute("SELECT COUNT(*) FROM templates").fetchone()[0]
+
+
+# ---------- Change tracking ----------
+def _current_revision(conn):
+    row = conn.execute(
+        "SELECT seq FROM sqlite_sequence WHERE name = 'template_changes'"
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def current_revision(db_path=DB_PATH):
+    """Latest revision written to the templates table (0 if never written)."""
+    return _current_revision(connect(db_path))
+
+
+def changes_since(revision, db_path=DB_PATH):
+    """Return (new_revision, changes) for everything written after `revision`.
+
+    `changes` maps (subject_id, finger_id) to the current minutiae, or to
+    None if the template was deleted; each key appears once however often it
+    changed. Returns (new_revision, None) when the log no longer reaches back
+    to `revision` (see prune_changes) and the caller must reload in full.
+    """
+    conn = connect(db_path)
+    with transaction(conn, "DEFERRED"):
+        new_revision = _current_revision(conn)
+        if new_revision <= revision:
+            return new_revision, {}
+
+        oldest = conn.execute("SELECT MIN(revision) FROM template_changes").fetchone()[0]
+        if oldest is None or oldest > revision + 1:
+            return new_revision, None
+
+        cursor = conn.execute("""
+            SELECT c.subject_id, c.finger_id, t.minutiae
+            FROM (SELECT DISTINCT subject_id, finger_id
+                  FROM template_changes WHERE revision > ?) AS c
+            LEFT JOIN templates AS t
+                ON t.subject_id = c.subject_id AND t.finger_id = c.finger_id
+        """, (revision,))
+        changes = {(subject, finger): decode_template(blob) if blob is not None else None
+                   for subject, finger, blob in cursor}
+    return new_revision, changes
+
+
+def _trim_change_log(conn, retention=None):
+    """Keep only the last `retention` revisions (call inside a write transaction)."""
+    retention = CHANGE_LOG_RETENTION if retention is None else retention
+    conn.execute("DELETE FROM template_changes WHERE revision <= ?",
+                 (_current_revision(conn) - retention,))
+
+
+def prune_changes(up_to_revision, db_path=DB_PATH):
+    """Drop change-log rows at or below `up_to_revision`.
+
+    Writers already keep the log to CHANGE_LOG_RETENTION revisions; this is
+    for pruning further by hand. Galleries older than the pruned range fall
+    back to a full reload.
+    """
+    conn = connect(db_path)
+    with transaction(conn):
+        conn.execute("DELETE FROM template_changes WHERE revision <= ?", (up_to_revision,))
@@ -0,0 +1,135 @@
+# synthetic.py
+import numpy as np
+
+import storage
+from minutiae import MinutiaeSet, TERMINATION, BIFURCATION
+
+# SOCOFing images are 96x103; extraction drops minutiae within 3 px of the border
+WIDTH, HEIGHT = 96, 103
+MARGIN = 4
+CELL = 6                      # one minutia per grid cell ...
+OFFSET = CELL - 4             # ... jittered by 0..OFFSET-1 px, so neighbours stay >= 5 px apart
+MIN_SPACING = 4               # extraction drops any minutia within 4 px of another
+
+
+def min_spacing(xy):
+    """Smallest pairwise distance between minutiae (inf for fewer than two)."""
+    xy = np.asarray(xy, dtype=np.float64)
+    if len(xy) < 2:
+        return np.inf
+    d = np.hypot(*(xy[:, None, :] - xy[None, :, :]).transpose(2, 0, 1))
+    return d[np.triu_indices(len(xy), 1)].min()
+
+
+def _wrap_branches(angle):
+    """Three bifurcation branches, wrapped the way get_ridge_orientation does."""
+    plus, minus = angle + 120, angle - 120
+    plus = np.where(plus > 180, plus % 360 - 180, plus % 360)
+    minus = np.where(minus > 180, minus % 360 - 180, minus % 360)
+    return np.stack([angle, plus, minus], axis=1)
+
+
+def _angles(kind, theta):
+    angles = np.full((len(kind), 3), np.nan)
+    angles[kind == TERMINATION, 0] = theta[kind == TERMINATION]
+    angles[kind == BIFURCATION] = _wrap_branches(theta[kind == BIFURCATION])
+    return angles
+
+
+def random_template(rng, n_minutiae=(25, 45), bifurcation_ratio=0.4):
+    """One synthetic template with a smooth orientation field.
+
+    `n_minutiae` is a count or an inclusive (low, high) range. Minutiae are
+    placed in distinct grid cells so their spacing matches extracted ones.
+    """
+    cols = (WIDTH - 2 * MARGIN) // CELL
+    rows = (HEIGHT - 2 * MARGIN) // CELL
+    if np.ndim(n_minutiae):
+        n_minutiae = rng.integers(n_minutiae[0], n_minutiae[1] + 1)
+    n_minutiae = min(int(n_minutiae), cols * rows)
+
+    cells = rng.choice(cols * rows, size=n_minutiae, replace=False)
+    x = MARGIN + (cells % cols) * CELL + rng.integers(0, OFFSET, n_minutiae)
+    y = MARGIN + (cells // cols) * CELL + rng.integers(0, OFFSET, n_minutiae)
+    assert min_spacing(np.stack([x, y], axis=1)) > MIN_SPACING
+
+    # Ridge flow: per-finger base direction bent by a low-frequency field
+    base, bend, phase = rng.uniform(-180, 180), rng.uniform(10, 40), rng.uniform(0, 2 * np.pi)
+    theta = base + bend * np.sin(x / WIDTH * np.pi + phase) * np.cos(y / HEIGHT * np.pi)
+    theta = (theta + rng.normal(0, 5, n_minutiae) + 180) % 360 - 180
+
+    kind = np.where(rng.random(n_minutiae) < bifurcation_ratio, BIFURCATION, TERMINATION)
+    return MinutiaeSet(np.stack([x, y], axis=1), kind, _angles(kind, theta))
+
+
+def perturb(template, rng, max_rotation=10.0, max_translation=5, dropout=0.1,
+            spurious=0.05, jitter=1.0):
+    """Mated impression of `template`: rotated, shifted, with missed and spurious minutiae."""
+    n = len(template)
+    keep = rng.random(n) >= dropout
+    xy = template.xy[keep].astype(np.float64)
+    kind = template.kind[keep]
+    theta = template.theta[keep].astype(np.float64)
+
+    rotation = rng.uniform(-max_rotation, max_rotation)
+    c, s = np.cos(np.radians(rotation)), np.sin(np.radians(rotation))
+    center = xy.mean(axis=0) if len(xy) else np.zeros(2)
+    xy = (xy - center) @ np.array([[c, s], [-s, c]]) + center
+    xy += rng.integers(-max_translation, max_translation + 1, 2)
+    xy += rng.normal(0, jitter, xy.shape)
+    theta = (theta + rotation + 180) % 360 - 180
+
+    n_extra = rng.binomial(n, spurious)
+    if n_extra:
+        extra = random_template(rng, n_extra)
+        xy = np.concatenate([xy, extra.xy])
+        kind = np.concatenate([kind, extra.kind])
+        theta = np.concatenate([theta, extra.theta])
+
+    xy = np.rint(xy)
+    inside = ((xy[:, 0] > 3) & (xy[:, 0] < WIDTH - 3)
+              & (xy[:, 1] > 3) & (xy[:, 1] < HEIGHT - 3))
+    kind = kind[inside]
+    return MinutiaeSet(xy[inside], kind, _angles(kind, theta[inside]))
+
+
+def subject_id(index):
+    return f"syn{index:07d}"
+
+
+def subject_template(index, seed=0, **template_kwargs):
+    """Reproducible template for synthetic subject `index`, without touching the store."""
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(0, index)))
+    return random_template(rng, **template_kwargs)
+
+
+def generate_gallery(n_subjects, db_path=storage.DB_PATH, start=0, seed=0,
+                     batch_size=1000, **template_kwargs):
+    """Write synthetic subjects start .. n_subjects-1 into the templates store.
+
+    Returns the number of templates written. Re-running with the same seed
+    is idempotent, so galleries can be grown step by step.
+    """
+    rows = ((subject_id(i), 'synthetic', subject_template(i, seed, **template_kwargs))
+            for i in range(start, n_subjects))
+    return storage.upsert_templates(rows, db_path, batch_size=batch_size)
+
+
+def generate_probes(n_probes, n_subjects, seed=0, mated_ratio=1.0, template_kwargs=None,
+                    **perturb_kwargs):
+    """Probes against a gallery of `n_subjects` synthetic subjects.
+
+    Returns a list of (true_key, minutiae); true_key is None for non-mated
+    probes, which are fresh random templates.
+    """
+    template_kwargs = template_kwargs or {}
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(1,)))
+    probes = []
+    for _ in range(n_probes):
+        if rng.random() < mated_ratio:
+            index = int(rng.integers(n_subjects))
+            template = subject_template(index, seed, **template_kwargs)
+            probes.append(((subject_id(index), 'synthetic'), perturb(template, rng, **perturb_kwargs)))
+        else:
+            probes.append((None, random_template(rng, **template_kwargs)))
+    return probes
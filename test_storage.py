@@ -0,0 +1,115 @@
+# test_storage.py
+import json
+import sqlite3
+
+import pytest
+
+import storage
+
+TEMPLATE = [(10, 20, 45.0, 'Termination'), (30, 40, [10.0, 130.0, -110.0], 'Bifurcation')]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "fingerprints.db")
+    yield path
+    storage.close(path)
+
+
+def _legacy_db(path, create, rows):
+    conn = sqlite3.connect(path)
+    conn.execute(create)
+    conn.executemany(f"INSERT INTO templates VALUES ({', '.join('?' * len(rows[0]))})", rows)
+    conn.commit()
+    conn.close()
+
+
+def _tuples(minutiae):
+    return [(int(x), int(y), angle, kind) for x, y, angle, kind in minutiae]
+
+
+# ---------- Migrations ----------
+def test_migrates_user_id_layout(db_path):
+    blob = json.dumps(TEMPLATE).encode()
+    _legacy_db(db_path, "CREATE TABLE templates (user_id TEXT PRIMARY KEY, minutiae BLOB)",
+               [("alice", blob), ("bob", blob)])
+
+    conn = storage.connect(db_path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == storage.SCHEMA_VERSION
+    assert storage._columns(conn, 'templates') == ['subject_id', 'finger_id', 'minutiae']
+
+    templates = storage.load_templates(db_path)
+    assert sorted(templates) == [("alice", ""), ("bob", "")]
+    assert _tuples(templates[("alice", "")]) == TEMPLATE
+
+
+def test_migrates_subject_finger_layout(db_path):
+    _legacy_db(db_path, """
+        CREATE TABLE templates (subject_id TEXT, finger_id TEXT, minutiae BLOB,
+                                PRIMARY KEY (subject_id, finger_id))
+    """, [("1", "Left_index", json.dumps(TEMPLATE).encode())])
+
+    assert _tuples(storage.load_subject("1", db_path)["Left_index"]) == TEMPLATE
+
+
+def test_migration_is_idempotent(db_path):
+    storage.upsert_templates([("1", "Left_index", TEMPLATE)], db_path)
+    storage.close(db_path)
+    assert storage.count_templates(db_path) == 1
+    assert storage.current_revision(db_path) == 1
+
+
+# ---------- Change tracking ----------
+def test_changes_since_tracks_upsert_replace_delete(db_path):
+    storage.upsert_templates([("1", "a", TEMPLATE), ("2", "a", TEMPLATE)], db_path)
+    revision = storage.current_revision(db_path)
+
+    replaced = TEMPLATE[:1]
+    storage.upsert_templates([("1", "a", replaced), ("3", "a", TEMPLATE)], db_path)
+    storage.delete_templates([("2", "a")], db_path)
+
+    new_revision, changes = storage.changes_since(revision, db_path)
+    assert new_revision > revision
+    assert set(changes) == {("1", "a"), ("2", "a"), ("3", "a")}
+    assert _tuples(changes[("1", "a")]) == replaced
+    assert changes[("2", "a")] is None
+    assert storage.changes_since(new_revision, db_path) == (new_revision, {})
+
+
+def test_changes_since_sees_raw_insert_or_replace(db_path):
+    storage.upsert_templates([("1", "a", TEMPLATE)], db_path)
+    revision = storage.current_revision(db_path)
+
+    conn = storage.connect(db_path)
+    conn.execute("INSERT OR REPLACE INTO templates VALUES (?, ?, ?)",
+                 ("1", "a", storage.encode_template(TEMPLATE[1:])))
+
+    _, changes = storage.changes_since(revision, db_path)
+    assert _tuples(changes[("1", "a")]) == TEMPLATE[1:]
+
+
+def test_gallery_reloads_after_prune(db_path):
+    from gallery import Gallery
+
+    storage.upsert_templates([("1", "a", TEMPLATE)], db_path)
+    gallery = Gallery(db_path)
+
+    storage.upsert_templates([("2", "a", TEMPLATE)], db_path)
+    storage.delete_templates([("1", "a")], db_path)
+    storage.prune_changes(storage.current_revision(db_path), db_path)
+
+    assert storage.changes_since(gallery.revision, db_path)[1] is None
+    assert gallery.refresh() is None
+    assert list(gallery) == [("2", "a")]
+    assert gallery.revision == storage.current_revision(db_path)
+
+
+def test_writers_trim_change_log(db_path, monkeypatch):
+    monkeypatch.setattr(storage, 'CHANGE_LOG_RETENTION', 3)
+    storage.upsert_templates([(str(i), "a", TEMPLATE) for i in range(10)], db_path, batch_size=2)
+
+    conn = storage.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM template_changes").fetchone()[0] == 3
+    assert storage.changes_since(0, db_path)[1] is None
+    _, changes = storage.changes_since(storage.current_revision(db_path) - 3, db_path)
+    assert set(changes) == {("7", "a"), ("8", "a"), ("9", "a")}